@@ -1,8 +1,10 @@
+import io
 import streamlit as st 
 import pandas as pd
 import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
+from collections import deque
 from datetime import datetime
 from streamlit_autorefresh import st_autorefresh
 
@@ -24,11 +26,26 @@ st.markdown("System Status: 🔵 Online | Mode: Multimodal Fusion Active")
 st.divider()
 
 # -------------------- DATA SOURCE --------------------
+@st.cache_data(show_spinner=False)
+def _load_preloaded(path):
+    return pd.read_csv(path, engine="pyarrow", dtype_backend="pyarrow")
+
+@st.cache_data(show_spinner=False)
+def _load_uploaded(raw: bytes):
+    return pd.read_csv(io.BytesIO(raw), engine="pyarrow", dtype_backend="pyarrow")
+
+if "rng" not in st.session_state:
+    st.session_state.rng = np.random.default_rng()
+rng = st.session_state.rng
+
+# Advances only when the autorefresh timer fires, not on button clicks or other widget reruns
+tick = st.session_state.get("auto_refresh") or 0
+
 mode = st.radio("📊 Select Data Source:", ["Simulated Live Data", "Preloaded CSV", "Upload CSV"])
 
 if mode == "Preloaded CSV":
     try:
-        df = pd.read_csv("mine_sensor_data.csv")
+        df = _load_preloaded("mine_sensor_data.csv")
         st.success("✅ Preloaded CSV loaded successfully!")
     except:
         st.error("⚠ Preloaded file 'mine_sensor_data.csv' not found.")
@@ -37,28 +54,38 @@ if mode == "Preloaded CSV":
 elif mode == "Upload CSV":
     uploaded = st.file_uploader("📂 Upload your CSV file", type=["csv"])
     if uploaded:
-        df = pd.read_csv(uploaded)
+        df = _load_uploaded(uploaded.getvalue())
         st.success("✅ Uploaded CSV loaded successfully!")
     else:
         st.warning("Please upload a CSV to continue.")
         st.stop()
 
 else:
-    if "df" not in st.session_state:
-        st.session_state.df = pd.DataFrame(columns=["Timestamp","Vibration","Slope","Weather","Risk"])
-    new_data = {
-        "Timestamp": datetime.now().strftime("%H:%M:%S"),
-        "Vibration": round(np.random.normal(0.5,0.2),3),
-        "Slope": round(np.random.normal(45,3),2),
-        "Weather": np.random.choice(["Sunny","Rainy","Cloudy","Windy"]),
-        "Risk": np.random.randint(0,100)
-    }
-    st.session_state.df = pd.concat([st.session_state.df, pd.DataFrame([new_data])], ignore_index=True)
-    df = st.session_state.df.tail(50)
+    rows = st.session_state.setdefault("rows", deque(maxlen=50))
+    if not rows or st.session_state.get("tick") != tick:
+        st.session_state.tick = tick
+        rows.append({
+            "Timestamp": np.datetime64(datetime.now(), "s"),
+            "Vibration": round(rng.normal(0.5,0.2),3),
+            "Slope": round(rng.normal(45,3),2),
+            "Weather": rng.choice(["Sunny","Rainy","Cloudy","Windy"]),
+            "Risk": rng.integers(0,100)
+        })
+    df = pd.DataFrame(list(rows), columns=["Timestamp","Vibration","Slope","Weather","Risk"])
+    # Simulated Risk is always a whole number from rng.integers, so int16 is exact
+    df = df.astype({"Risk": "int16"})
+
+# Sensor readings don't need 64-bit precision; halves what gets sent to the browser.
+# CSV Risk may be fractional or empty, so it stays float64 to keep thresholds and NaN exact.
+df = df.astype({"Vibration": "float32", "Slope": "float32"})
+if mode != "Simulated Live Data":
+    df = df.astype({"Risk": "float64"})
 
 # -------------------- METRICS --------------------
 col1, col2, col3, col4 = st.columns(4)
-current_risk = df["Risk"].iloc[-1]
+last = df.iloc[-1]
+current_risk = last["Risk"]
+last_ts = last["Timestamp"]
 if current_risk > 70:
     risk_status = "🔴 HIGH"
 elif current_risk > 40:
@@ -68,78 +95,84 @@ else:
 
 with col1: st.metric("Current Risk", risk_status)
 with col2: st.metric("Active Sensors", "📸 5 | 🎙 3")
-with col3: st.metric("Last Update", str(df["Timestamp"].iloc[-1]))
-with col4: st.metric("Weather", df["Weather"].iloc[-1])
+with col3: st.metric("Last Update", last_ts.strftime("%H:%M:%S") if hasattr(last_ts, "strftime") else str(last_ts))
+with col4: st.metric("Weather", last["Weather"])
 
 st.divider()
 
 # -------------------- DYNAMIC RISK GAUGE --------------------
 st.subheader("🧭 Risk Gauge")
 
-gauge = go.Figure(go.Indicator(
-    mode="gauge+number",
-    value=current_risk,
-    title={"text": "Current Risk %"},
-    gauge={
-        "axis": {"range": [0, 100]},
-        "bar": {"color": "cyan"},
-        "steps": [
-            {"range": [0, 40], "color": "green"},   # Low
-            {"range": [40, 70], "color": "yellow"}, # Medium
-            {"range": [70, 100], "color": "red"}    # High
-        ]
-    }
-))
+def _gauge():
+    fig = go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=0,
+        title={"text": "Current Risk %"},
+        gauge={
+            "axis": {"range": [0, 100]},
+            "bar": {"color": "cyan"},
+            "steps": [
+                {"range": [0, 40], "color": "green"},   # Low
+                {"range": [40, 70], "color": "yellow"}, # Medium
+                {"range": [70, 100], "color": "red"}    # High
+            ]
+        }
+    ))
 
-gauge.update_layout(
-    paper_bgcolor="#0d1117",
-    font={"color": "#00FFEF"}
-)
+    fig.update_layout(
+        paper_bgcolor="#0d1117",
+        font={"color": "#00FFEF"}
+    )
+    return fig
+
+# Gauge config never changes, so keep the figure per session and only move the needle
+if "gauge" not in st.session_state:
+    st.session_state.gauge = _gauge()
+gauge = st.session_state.gauge
+gauge.data[0].value = current_risk
 
 st.plotly_chart(gauge, use_container_width=True)
 
 # -------------------- VIBRATION + SLOPE --------------------
-col_a, col_b = st.columns(2)
-
-# --- Vibration ---
-vib_min, vib_max = df["Vibration"].min(), df["Vibration"].max()
-vib_range = vib_max - vib_min
-vib_low = vib_min + 0.3 * vib_range
-vib_high = vib_min + 0.7 * vib_range
-
-with col_a:
-    st.subheader("📈 Vibration Trend")
-    fig_vibration = px.line(df, x="Timestamp", y="Vibration", markers=True,
-                            title="Vibration Levels", line_shape="spline",
-                            color_discrete_sequence=["orange"])
-    fig_vibration.update_layout(template="plotly_dark",
-                                plot_bgcolor="#0d1117", paper_bgcolor="#0d1117")
-    fig_vibration.add_hrect(y0=vib_min, y1=vib_low, fillcolor="green", opacity=0.2, line_width=0, annotation_text="Low", annotation_position="left")
-    fig_vibration.add_hrect(y0=vib_high, y1=vib_max, fillcolor="red", opacity=0.2, line_width=0, annotation_text="High", annotation_position="left")
-    st.plotly_chart(fig_vibration, use_container_width=True)
-
-# --- Slope ---
-slope_min, slope_max = df["Slope"].min(), df["Slope"].max()
-slope_range = slope_max - slope_min
-slope_low = slope_min + 0.3 * slope_range
-slope_high = slope_min + 0.7 * slope_range
-
-with col_b:
-    st.subheader("⛰ Slope Angle Trend")
-    fig_slope = px.line(df, x="Timestamp", y="Slope", markers=True,
-                        title="Slope Angle", line_shape="spline",
-                        color_discrete_sequence=["lime"])
-    fig_slope.update_layout(template="plotly_dark",
-                            plot_bgcolor="#0d1117", paper_bgcolor="#0d1117")
-    fig_slope.add_hrect(y0=slope_min, y1=slope_low, fillcolor="green", opacity=0.2, line_width=0, annotation_text="Low", annotation_position="left")
-    fig_slope.add_hrect(y0=slope_high, y1=slope_max, fillcolor="red", opacity=0.2, line_width=0, annotation_text="High", annotation_position="left")
-    st.plotly_chart(fig_slope, use_container_width=True)
+def trend_chart(df, charts):
+    columns = list(charts)
+    long = df.melt(id_vars="Timestamp", value_vars=columns, var_name="Metric", value_name="Value")
+
+    fig = px.line(long, x="Timestamp", y="Value", color="Metric", facet_col="Metric",
+                  markers=True, render_mode="webgl",
+                  category_orders={"Metric": columns},
+                  color_discrete_sequence=[color for _, color in charts.values()])
+    fig.update_yaxes(matches=None, showticklabels=True)
+    fig.update_layout(template="plotly_dark", showlegend=False,
+                      plot_bgcolor="#0d1117", paper_bgcolor="#0d1117")
+    fig.for_each_annotation(lambda a: a.update(text=charts[a.text.split("=")[-1]][0]))
+
+    for i, column in enumerate(columns, start=1):
+        vals = df[column].to_numpy(dtype=float)
+        lo, hi = np.nanmin(vals), np.nanmax(vals)
+        low, high = lo + 0.3 * (hi - lo), lo + 0.7 * (hi - lo)
+        fig.add_hrect(y0=lo, y1=low, row=1, col=i, fillcolor="green", opacity=0.2, line_width=0, annotation_text="Low", annotation_position="left")
+        fig.add_hrect(y0=high, y1=hi, row=1, col=i, fillcolor="red", opacity=0.2, line_width=0, annotation_text="High", annotation_position="left")
+    return fig
+
+st.subheader("📈 Vibration & ⛰ Slope Angle Trends")
+st.plotly_chart(trend_chart(df, {"Vibration": ("Vibration Levels", "orange"),
+                                 "Slope": ("Slope Angle", "lime")}),
+                use_container_width=True)
 
 # -------------------- THERMAL HEATMAP WITH SENSORS + AXES --------------------
 st.subheader("🌡 Thermal Heatmap with Sensors")
 
-heat_data = np.random.normal(loc=current_risk, scale=15, size=(20, 20))
-heat_data = np.clip(heat_data, 0, 100)
+@st.cache_data(show_spinner=False)
+def _heat(bucket: int, seed: int = 0):
+    rng = np.random.default_rng(seed + bucket)
+    heat = rng.normal(loc=bucket * 5 + 2.5, scale=15, size=(20, 20))
+    np.clip(heat, 0, 100, out=heat)
+    return heat.astype(np.uint8)
+
+# An empty Risk cell in a CSV leaves nothing to centre the grid on, so show it blank
+# Out-of-range CSV values are clamped first; the grid is clipped to 0-100 anyway
+heat_data = _heat(int(np.clip(current_risk, 0, 100)) // 5) if pd.notna(current_risk) else np.full((20, 20), np.nan)
 
 # Sensor positions (X=0–20, Y=0–20 since grid is 20x20)
 sensors = {
@@ -155,6 +188,7 @@ heat_fig = go.Figure(data=go.Heatmap(
     z=heat_data,
     colorscale="Viridis",
     zmin=0, zmax=100,
+    zsmooth=False,
     colorbar=dict(
         title="Temperature/Risk Level",
         tickvals=[0, 50, 100],
@@ -198,21 +232,40 @@ st.plotly_chart(heat_fig, use_container_width=True)
 
 # -------------------- ALERTS LOG --------------------
 st.subheader("🚨 Alerts Log")
-alerts = df.tail(5).copy()
-alerts["Action"] = np.where(alerts["Risk"]>70,"🔴 Evacuation",
-                     np.where(alerts["Risk"]>40,"🟡 Warning","🟢 Monitoring"))
+latest = df.tail(5)
+alerts = latest.assign(Action=pd.cut(latest["Risk"], bins=[-np.inf, 40, 70, np.inf],
+                                     labels=["🟢 Monitoring", "🟡 Warning", "🔴 Evacuation"]).fillna("🟢 Monitoring"))
 st.dataframe(alerts, use_container_width=True)
 
 # -------------------- RESTRICTED AREA & WORKER GEO --------------------
 st.subheader("🚫 Restricted Area Detection")
-restricted_areas = ["Zone A", "Zone C", "Zone E"]
-worker_zones = np.random.choice(["Zone A","Zone B","Zone C","Zone D","Zone E"], size=5)
-restricted_alerts = [zone for zone in worker_zones if zone in restricted_areas]
+
+mine_center = {"lat": 20.5937, "lon": 78.9629}
+num_workers = 10
+
+# Worker state belongs to this session and only moves when the tick advances,
+# so keep it next to the readings instead of in the process-wide cache
+if st.session_state.get("workers_tick") != tick:
+    st.session_state.workers_tick = tick
+    st.session_state.worker_zones = rng.choice(["Zone A","Zone B","Zone C","Zone D","Zone E"], size=5)
+    st.session_state.worker_positions = pd.DataFrame({
+        "Worker": [f"Worker {i+1}" for i in range(num_workers)],
+        "lat": mine_center["lat"] + rng.uniform(-0.01, 0.01, num_workers),
+        "lon": mine_center["lon"] + rng.uniform(-0.01, 0.01, num_workers)
+    })
+    st.session_state.worker_drift = rng.uniform(-0.002, 0.002, size=(2, num_workers))
+
+restricted_areas = {"Zone A", "Zone C", "Zone E"}
+worker_zones = st.session_state.worker_zones
+restricted_alerts = worker_zones[np.isin(worker_zones, list(restricted_areas))].tolist()
 
 if restricted_alerts:
     st.warning(f"⚠ Restricted Area Alert! Workers detected in: {', '.join(restricted_alerts)}")
+    alerts["Action"] = alerts["Action"].cat.add_categories("🚫 Restricted Area Entry")
+    now = datetime.now()
     alerts.loc[len(alerts)] = {
-        "Timestamp": datetime.now().strftime("%H:%M:%S"),
+        # Keep the live datetime64 column a single type; CSV timestamps stay as text
+        "Timestamp": np.datetime64(now, "s") if pd.api.types.is_datetime64_any_dtype(alerts["Timestamp"]) else now.strftime("%H:%M:%S"),
         "Vibration": np.nan,
         "Slope": np.nan,
         "Weather": np.nan,
@@ -222,34 +275,38 @@ if restricted_alerts:
 else:
     st.info("✅ No workers in restricted areas.")
 
-mine_center = {"lat": 20.5937, "lon": 78.9629}
-num_workers = 10
-worker_positions = pd.DataFrame({
-    "Worker": [f"Worker {i+1}" for i in range(num_workers)],
-    "lat": mine_center["lat"] + np.random.uniform(-0.01, 0.01, num_workers),
-    "lon": mine_center["lon"] + np.random.uniform(-0.01, 0.01, num_workers)
-})
+worker_positions = st.session_state.worker_positions
 
 restricted_zone = {"lat": mine_center["lat"] + 0.005,
                    "lon": mine_center["lon"] - 0.005,
                    "radius_km": 0.7}
 
-fig_workers = px.scatter_mapbox(
-    worker_positions, lat="lat", lon="lon", text="Worker",
-    zoom=14, height=600, color_discrete_sequence=["cyan"]
-)
+def _base_map(worker_positions, restricted_zone):
+    fig = px.scatter_mapbox(
+        worker_positions, lat="lat", lon="lon", text="Worker",
+        zoom=14, height=600, color_discrete_sequence=["cyan"]
+    )
 
-fig_workers.update_traces(textfont=dict(color="black"))
-fig_workers.add_trace(go.Scattermapbox(
-    lat=[restricted_zone["lat"]],
-    lon=[restricted_zone["lon"]],
-    mode="markers+text",
-    marker=dict(size=18, color="red"),
-    text=["🚫 Restricted Zone"],
-    textposition="top right",
-    textfont=dict(color="black")
-))
-fig_workers.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0}, paper_bgcolor="#0d1117", font=dict(color="white"))
+    fig.update_traces(textfont=dict(color="black"))
+    fig.add_trace(go.Scattermapbox(
+        lat=[restricted_zone["lat"]],
+        lon=[restricted_zone["lon"]],
+        mode="markers+text",
+        marker=dict(size=18, color="red"),
+        text=["🚫 Restricted Zone"],
+        textposition="top right",
+        textfont=dict(color="black")
+    ))
+    fig.update_layout(mapbox_style="open-street-map", margin={"r":0,"t":0,"l":0,"b":0}, paper_bgcolor="#0d1117", font=dict(color="white"))
+    return fig
+
+# Build the map once per session and only move the worker markers on reruns
+if "worker_map" not in st.session_state:
+    st.session_state.worker_map = _base_map(worker_positions, restricted_zone)
+fig_workers = st.session_state.worker_map
+with fig_workers.batch_update():
+    fig_workers.data[0].lat = worker_positions["lat"].to_numpy()
+    fig_workers.data[0].lon = worker_positions["lon"].to_numpy()
 st.plotly_chart(fig_workers, use_container_width=True)
 
 if st.button("📢 Alert Workers Near Restricted Area"):
@@ -261,10 +318,11 @@ if st.button("📢 Alert Workers Near Restricted Area"):
 # -------------------- WORKER MOVEMENT DIRECTION --------------------
 st.subheader("🧭 Worker Danger Movement Prediction")
 
+drift = st.session_state.worker_drift
 worker_positions_prev = pd.DataFrame({
     "Worker": worker_positions["Worker"],
-    "lat": worker_positions["lat"] + np.random.uniform(-0.002, 0.002, num_workers),
-    "lon": worker_positions["lon"] + np.random.uniform(-0.002, 0.002, num_workers)
+    "lat": worker_positions["lat"] + drift[0],
+    "lon": worker_positions["lon"] + drift[1]
 })
 
 def haversine(lat1, lon1, lat2, lon2):
@@ -300,17 +358,32 @@ if st.button("🚨 SEND ALERT NOW"):
 
 # -------------------- FORECAST --------------------
 st.subheader("🔮 Forecast (Next 6 Hours)")
-hours = [f"{i}h" for i in range(1,7)]
-forecast = np.random.randint(20,95,size=6)
-df_forecast = pd.DataFrame({"Hour":hours,"Forecast Risk %":forecast})
-fig_forecast = px.bar(df_forecast, x="Hour", y="Forecast Risk %",
-                      color="Forecast Risk %", title="Predicted Risk Probability",
-                      color_continuous_scale="turbo")
-fig_forecast.update_layout(template="plotly_dark", plot_bgcolor="#0d1117", paper_bgcolor="#0d1117")
+def _forecast_fig():
+    hours = [f"{i}h" for i in range(1,7)]
+    df_forecast = pd.DataFrame({"Hour":hours,"Forecast Risk %":[0]*6})
+    fig = px.bar(df_forecast, x="Hour", y="Forecast Risk %",
+                 color="Forecast Risk %", title="Predicted Risk Probability",
+                 color_continuous_scale="turbo")
+    fig.update_layout(template="plotly_dark", plot_bgcolor="#0d1117", paper_bgcolor="#0d1117")
+    return fig
+
+# Same as the worker map: keep the figure per session and only swap the bar values
+if "forecast_fig" not in st.session_state:
+    st.session_state.forecast_fig = _forecast_fig()
+fig_forecast = st.session_state.forecast_fig
+if st.session_state.get("forecast_tick") != tick:
+    st.session_state.forecast_tick = tick
+    st.session_state.forecast = rng.integers(20,95,size=6)
+forecast = st.session_state.forecast
+with fig_forecast.batch_update():
+    fig_forecast.data[0].y = forecast
+    fig_forecast.data[0].marker.color = forecast
 st.plotly_chart(fig_forecast, use_container_width=True)
 
 # -------------------- AUTO REFRESH --------------------
-st_autorefresh(interval=60*1000, key="auto_refresh")
+# Static CSV sources have nothing new to show, so only live data refreshes
+if mode == "Simulated Live Data":
+    st_autorefresh(interval=60*1000, key="auto_refresh")
 
 # -------------------- FOOTER --------------------
 st.markdown("---")